@@ -9,6 +9,20 @@ generate visualizations, and provide a web interface for interactive analysis.
 __version__ = "1.0.0"
 __author__ = "PC Misprediction Analyzer"
 
+from importlib import import_module
+
 from .analyzer import analyze_mispredictions, print_results, export_to_csv
-from .visualizer import create_static_chart, create_export_chart
-from .web_app import MispredictionWebApp
\ No newline at end of file
+
+# visualizer pulls in matplotlib and web_app pulls in Flask, so they are
+# only imported when one of their names is first accessed
+_LAZY_EXPORTS = {
+    "create_static_chart": "visualizer",
+    "create_export_chart": "visualizer",
+    "MispredictionWebApp": "web_app",
+}
+
+def __getattr__(name):
+    module = _LAZY_EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    return getattr(import_module(f".{module}", __name__), name)
\ No newline at end of file
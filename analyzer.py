@@ -1,116 +1,246 @@
 # analyzer.py
+import functools
+import logging
+import os
+import queue
 import sqlite3
-from typing import List, Tuple, Dict, Optional
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Dict, List, Tuple, Optional
+
+# Progress messages; main.py prints them, the web app logs them off-thread
+logger = logging.getLogger(__name__)
+
+# Full rankings of recent analyses, keyed by
+# (db_path, db_mtime, tick_range, min_branches)
+_RANKING_CACHE: "OrderedDict[tuple, tuple]" = OrderedDict()
+_RANKING_CACHE_SIZE = 8
+_RANKING_CACHE_LOCK = threading.Lock()
+
+# Idle connections per database path, with the inode they were opened on
+_CONNECTION_POOLS: Dict[str, Tuple[int, "queue.SimpleQueue[sqlite3.Connection]"]] = {}
+_CONNECTION_POOLS_LOCK = threading.Lock()
 
 def shift_pc_left(pc: int) -> int:
     """Shift PC left by 1 bit (multiply by 2) to get full address"""
     return pc << 1
 
+def configure_connection(conn: sqlite3.Connection):
+    """Apply pragmas for reading large trace databases"""
+    conn.execute("PRAGMA synchronous=NORMAL")
+    # temp_store=MEMORY and a larger cache_size measured slower for the
+    # GROUP BY aggregation, so SQLite's defaults are kept for both
+    conn.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+
+def connect(db_path: str) -> sqlite3.Connection:
+    """Open a configured connection that may be used from any thread"""
+    conn = sqlite3.connect(db_path, check_same_thread=False)
+    configure_connection(conn)
+    return conn
+
+@contextmanager
+def pooled_connection(db_path: str):
+    """
+    Borrow an idle connection to db_path, opening a new one if none is free
+    
+    Connections keep their page cache and prepared statements between
+    analyses. The pool is dropped when the file is replaced (new inode),
+    so a regenerated trace is never read through a stale connection.
+    """
+    inode = os.stat(db_path).st_ino
+    with _CONNECTION_POOLS_LOCK:
+        pool_inode, pool = _CONNECTION_POOLS.get(db_path, (None, None))
+        if pool_inode != inode:
+            while pool is not None and not pool.empty():
+                pool.get_nowait().close()
+            pool = queue.SimpleQueue()
+            _CONNECTION_POOLS[db_path] = (inode, pool)
+    
+    try:
+        conn = pool.get_nowait()
+    except queue.Empty:
+        conn = connect(db_path)
+    try:
+        yield conn
+    finally:
+        pool.put(conn)
+
+def ensure_stamp_indexes(conn: sqlite3.Connection, tables: List[str]):
+    """
+    Create covering indexes on (STAMP, CFIPC, STARTPC_ADDR, MISPREDICT)
+    
+    Tick range filters become index range scans and the aggregation is
+    answered from the index alone. Building them costs a full scan and
+    roughly doubles the trace file, so analyses only do so when asked to
+    (build_index). All indexes are created in one transaction; read-only
+    databases are left untouched.
+    """
+    try:
+        conn.execute("BEGIN")
+        for table_name in tables:
+            conn.execute(
+                f"CREATE INDEX IF NOT EXISTS idx_{table_name}_stamp "
+                f"ON {table_name}(STAMP, CFIPC, STARTPC_ADDR, MISPREDICT)"
+            )
+        conn.execute("COMMIT")
+    except sqlite3.OperationalError as e:
+        if conn.in_transaction:
+            conn.execute("ROLLBACK")
+        logger.warning("Could not create STAMP indexes (%s), continuing without them", e)
+
+@functools.lru_cache(maxsize=32)
+def build_query(tables: Tuple[str, ...], with_tick_range: bool) -> str:
+    """
+    Build the aggregation query over the given CondTrace tables
+    
+    The text only depends on the table set and whether a tick range is
+    used, so it is generated once and sqlite3's statement cache can reuse
+    the prepared statement. The tick range stays a real WHERE clause
+    rather than (? OR STAMP BETWEEN ? AND ?) so the STAMP index is usable.
+    
+    Parameters: (start, end) per table if with_tick_range, then
+    min_branches.
+    """
+    where = " WHERE STAMP BETWEEN ? AND ?" if with_tick_range else ""
+    
+    # One pass over all tables: SQLite merges the per-table rows, applies
+    # min_branches and sorts. Ties on the misprediction count are broken
+    # by PC so the order is stable. Rows come back as finished result
+    # tuples, rate included, so Python does no per-row work.
+    union = " UNION ALL ".join(
+        f"SELECT CFIPC, STARTPC_ADDR, MISPREDICT FROM {table_name}{where}"
+        for table_name in tables
+    )
+    return f"""
+    SELECT 
+        CAST(CFIPC AS INTEGER) as pc,
+        STARTPC_ADDR as startPc,
+        COUNT(*) as total,
+        SUM(MISPREDICT) as mispred,
+        CAST(SUM(MISPREDICT) AS REAL) / COUNT(*) as rate
+    FROM ({union})
+    GROUP BY CFIPC
+    HAVING total >= ?
+    ORDER BY mispred DESC, pc
+    """
+
 def analyze_mispredictions(db_path: str, top_n: int = 20, 
                           tick_range: Optional[Tuple[int, int]] = None, 
-                          min_branches: int = 10) -> List[Tuple[int, int, int, int, float]]:
+                          min_branches: int = 10,
+                          build_index: bool = False) -> List[Tuple[int, int, int, int, float, str, str]]:
     """
     Analyze PCs with most mispredictions
     
+    The full ranking of recent analyses is cached per database mtime, so
+    repeating an analysis with a different top_n does not query again.
+    
     Args:
         db_path: Database path
         top_n: Show top N PCs
         tick_range: (start, end) tick range
         min_branches: Minimum branches to include
+        build_index: Create STAMP indexes in the database first, which
+            speeds up repeated tick range analyses
         
     Returns:
-        List[(pc, startPc, total_count, mispred_count, rate), ...]
+        List[(pc, startPc, total_count, mispred_count, rate, pc_hex, startPc_hex), ...]
+        
+        The first five fields are the original result tuple; the hex
+        addresses are rendered once here for the returned rows only.
     """
-    conn = sqlite3.connect(db_path)
-    cur = conn.cursor()
+    tick_range = tuple(tick_range) if tick_range else None
+    key = (db_path, os.path.getmtime(db_path), tick_range, min_branches)
     
-    # Statistics
-    pc_stats: Dict[int, Dict[str, int]] = {}
+    with _RANKING_CACHE_LOCK:
+        ranking = _RANKING_CACHE.get(key)
+        if ranking is not None:
+            _RANKING_CACHE.move_to_end(key)
     
-    print("Starting analysis of tables...")
+    if ranking is None:
+        ranking = _rank_pcs(db_path, tick_range, min_branches, build_index)
+        # Creating the STAMP indexes touches the file, so key the entry on
+        # the mtime after the query to let the next call hit
+        key = (db_path, os.path.getmtime(db_path), tick_range, min_branches)
+        with _RANKING_CACHE_LOCK:
+            _RANKING_CACHE[key] = ranking
+            while len(_RANKING_CACHE) > _RANKING_CACHE_SIZE:
+                _RANKING_CACHE.popitem(last=False)
+    
+    return add_hex_addresses(ranking[:top_n])
+
+def add_hex_addresses(results) -> List[Tuple[int, int, int, int, float, str, str]]:
+    """
+    Append pc_hex and startPc_hex to result tuples that do not carry them yet
     
-    # Process 8 CondTrace tables
+    Lets print_results, export_to_csv and the charts accept plain
+    (pc, startPc, total, mispred, rate) tuples as well.
+    """
+    return [r if len(r) == 7 else (*r, hex(r[0]), hex(r[1])) for r in results]
+
+def _rank_pcs(db_path: str, tick_range: Optional[Tuple[int, int]], 
+              min_branches: int, build_index: bool = False) -> Tuple[Tuple[int, int, int, int, float], ...]:
+    """Query all PCs passing min_branches, sorted by misprediction count"""
+    logger.info("Starting analysis of tables...")
+    
+    with pooled_connection(db_path) as conn:
+        results = _query_ranking(conn, tick_range, min_branches, build_index)
+    
+    if not results:
+        logger.info("No data found!")
+        return ()
+    
+    total_branches = sum(r[2] for r in results)  # r[2] is total count
+    total_mispred = sum(r[3] for r in results)   # r[3] is mispred count
+    logger.info("\nAfter filtering: %d PCs", len(results))
+    logger.info("Total branches in filtered results: %s", f"{total_branches:,}")
+    logger.info("Total mispredictions: %s", f"{total_mispred:,}")
+    if total_branches > 0:
+        logger.info("Overall misprediction rate: %.2f%%\n", total_mispred / total_branches * 100)
+    
+    return tuple(results)
+
+def _query_ranking(conn: sqlite3.Connection, tick_range: Optional[Tuple[int, int]], 
+                   min_branches: int, build_index: bool = False) -> List[Tuple[int, int, int, int, float]]:
+    """Run the aggregation query over all existing CondTrace tables"""
+    cur = conn.cursor()
+    
+    # Find the CondTrace tables with a single catalog lookup
+    cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name LIKE 'CondTrace_%'")
+    present = {name for (name,) in cur.fetchall()}
+    
+    existing = []
     for table_id in range(8):
         table_name = f"CondTrace_{table_id}"
-        
-        # Check if table exists
-        cur.execute("SELECT name FROM sqlite_master WHERE type='table' AND name=?", (table_name,))
-        if not cur.fetchone():
-            print(f"Table {table_name} does not exist, skipping")
+        if table_name not in present:
+            logger.info("Table %s does not exist, skipping", table_name)
             continue
-        
-        print(f"Analyzing table {table_name}...")
-        
-        # Build query
-        where_clauses = []
-        params = []
-        
-        if tick_range:
-            where_clauses.append("STAMP BETWEEN ? AND ?")
-            params.extend(tick_range)
-        
-        where = " WHERE " + " AND ".join(where_clauses) if where_clauses else ""
-        
-        # query
-        sql = f"""
-        SELECT 
-            CFIPC as pc,
-            STARTPC_ADDR as startPc,
-            COUNT(*) as total,
-            SUM(MISPREDICT) as mispred
-        FROM {table_name}
-        {where}
-        GROUP BY CFIPC
-        """
-        
-        cur.execute(sql, params)
-        
-        for pc, startPc, total, mispred in cur.fetchall():
-            pc_int = int(pc)
-            if pc_int not in pc_stats:
-                pc_stats[pc_int] = {"startPc": 0, "total": 0, "mispred": 0}
-            
-            pc_stats[pc_int]['startPc'] = startPc
-            pc_stats[pc_int]["total"] += total
-            pc_stats[pc_int]["mispred"] += mispred
-    
-    conn.close()
-    
-    if not pc_stats:
-        print("No data found!")
+        logger.info("Analyzing table %s...", table_name)
+        existing.append(table_name)
+    
+    if not existing:
         return []
     
-    # Calculate misprediction rate and sort
-    results = []
-    for pc, stats in pc_stats.items():
-        startPc = stats["startPc"]
-        total = stats["total"]
-        if total < min_branches:
-            continue
-        mispred = stats["mispred"]
-        rate = mispred / total if total > 0 else 0
-        results.append((pc, startPc, total, mispred, rate))
-    
-    # Sort by misprediction count (descending)
-    results.sort(key=lambda x: x[3], reverse=True)  # x[3] is mispred count
-    
-    print(f"\nAnalyzed {len(pc_stats)} distinct PCs")
-    print(f"After filtering: {len(results)} PCs")
-    if results:
-        total_branches = sum(r[2] for r in results)  # r[2] is total count
-        total_mispred = sum(r[3] for r in results)   # r[3] is mispred count
-        print(f"Total branches in filtered results: {total_branches:,}")
-        print(f"Total mispredictions: {total_mispred:,}")
-        if total_branches > 0:
-            print(f"Overall misprediction rate: {total_mispred/total_branches*100:.2f}%\n")
-    
-    return results[:top_n]
+    # The STAMP indexes only help range scans, so even when asked for they
+    # are not built for full analyses
+    if build_index and tick_range:
+        ensure_stamp_indexes(conn, existing)
+    
+    # Tick range values are bound once per UNION ALL arm
+    params = list(tick_range) * len(existing) if tick_range else []
+    sql = build_query(tuple(existing), tick_range is not None)
+    
+    # The whole ranking is fetched because the results cache keeps it
+    # for every top_n; rows are already (pc, startPc, total, mispred, rate)
+    cur.execute(sql, params + [min_branches])
+    return cur.fetchall()
 
 def print_results(results: List[Tuple[int, int, int, int, float]]):
     """Print analysis results in formatted table"""
     if not results:
         print("No data to display")
         return
+    results = add_hex_addresses(results)
     
     print("\n" + "=" * 120)
     print("PC Misprediction Statistics (Sorted by Misprediction Count)")
@@ -118,8 +248,8 @@ def print_results(results: List[Tuple[int, int, int, int, float]]):
     print(f"{'Rank':<5} {'PC':<20} {'start PC':<18} {'Total Count':<15} {'Mispred Count':<15} {'Mispred Rate':<15}")
     print("-" * 120)
     
-    for i, (pc, startPc, total, mispred, rate) in enumerate(results, 1):
-        print(f"{i:<5} {hex(pc):<20} {hex(startPc):<18} {total:<15} {mispred:<15} {rate*100:<8.2f}%")
+    for i, (_, _, total, mispred, rate, pc_hex, sp_hex) in enumerate(results, 1):
+        print(f"{i:<5} {pc_hex:<20} {sp_hex:<18} {total:<15} {mispred:<15} {rate*100:<8.2f}%")
     
     print("=" * 120)
     
@@ -141,7 +271,9 @@ def export_to_csv(results: List[Tuple[int, int, int, int, float]], output_file:
         writer.writerow(['Rank', 'PC', 'Start PC', 
                         'Total Branches', 'Mispred Count', 'Mispred Rate (%)'])
         
-        for i, (pc, startPc, total, mispred, rate) in enumerate(results, 1):
-            writer.writerow([i, hex(pc), hex(startPc), total, mispred, f"{rate*100:.2f}"])
+        writer.writerows([
+            (i, pc_hex, sp_hex, total, mispred, f"{rate*100:.2f}")
+            for i, (_, _, total, mispred, rate, pc_hex, sp_hex) in enumerate(add_hex_addresses(results), 1)
+        ])
     
     print(f"CSV saved to: {output_file}")
\ No newline at end of file
@@ -1,28 +1,24 @@
 #!/usr/bin/env python3
 import argparse
+import logging
 import os
 import sys
 import socket
-import numpy as np
+from statistics import mean, median
 
 # 添加当前目录到Python路径
 current_dir = os.path.dirname(os.path.abspath(__file__))
 sys.path.insert(0, current_dir)
 
-# 直接导入各个模块文件
+# 直接导入分析模块; visualizer 和 web_app 在需要时才导入 (matplotlib/Flask 导入较慢)
 try:
     # 导入 analyzer.py 中的函数
     from analyzer import analyze_mispredictions, print_results, export_to_csv
-    # 导入 visualizer.py 中的函数
-    from visualizer import create_static_chart, create_export_chart
-    # 导入 web_app.py 中的类
-    from web_app import MispredictionWebApp
+    from analyzer import logger as analyzer_logger
 except ImportError as e:
     print(f"Import error: {e}")
     print("\n请确保以下文件存在于当前目录:")
     print("  ✓ analyzer.py - 数据分析核心逻辑")
-    print("  ✓ visualizer.py - 图表生成逻辑")
-    print("  ✓ web_app.py - Web界面逻辑")
     sys.exit(1)
 
 def parse_tick_range(tick_range_str: str):
@@ -35,19 +31,26 @@ def parse_tick_range(tick_range_str: str):
     except ValueError:
         raise ValueError("tick-range format should be start:end")
 
-def find_available_port(start_port=5000, max_attempts=100):
-    """Find an available port starting from start_port"""
-    for port in range(start_port, start_port + max_attempts):
+def find_available_port(host='127.0.0.1', preferred_port=5000):
+    """Return preferred_port if it is free on host, otherwise a port chosen by the OS"""
+    # Port 0 lets the kernel pick a free port instead of probing one by one
+    for port in (preferred_port, 0):
+        try:
+            # The address family follows host, so IPv6 hosts like '::' work too
+            addrinfo = socket.getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        except socket.gaierror:
+            break
+        family, socktype, proto, _, sockaddr = addrinfo[0]
+        sock = socket.socket(family, socktype, proto)
         try:
-            # Try to bind to the port
-            sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
             sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
-            sock.bind(('127.0.0.1', port))
-            sock.close()
-            return port
+            sock.bind(sockaddr)
+            return sock.getsockname()[1]
         except OSError:
             continue
-    raise RuntimeError(f"No available port found in range {start_port}-{start_port+max_attempts-1}")
+        finally:
+            sock.close()
+    raise RuntimeError(f"No available port found on {host}")
 
 def main():
     parser = argparse.ArgumentParser(
@@ -73,6 +76,8 @@ Note: PC addresses are displayed as full addresses (original PC << 1)
     parser.add_argument('--min-branches', type=int, default=10, 
                        help='Minimum number of branches to consider (default: 10)')
     parser.add_argument('--verbose', action='store_true', help='Show verbose output')
+    parser.add_argument('--build-index', action='store_true',
+                       help='Add STAMP indexes to the database to speed up repeated --tick-range runs')
     
     args = parser.parse_args()
     
@@ -97,15 +102,21 @@ Note: PC addresses are displayed as full addresses (original PC << 1)
             print(f"  python {sys.argv[0]} --db trace.db --top 20 --plot")
             return
         
-        app = MispredictionWebApp(args.db)
-        app.run(host=args.host, port=find_available_port())
+        # 导入 web_app.py 中的类
+        from web_app import MispredictionWebApp
+        app = MispredictionWebApp(args.db, build_index=args.build_index)
+        app.run(host=args.host, port=find_available_port(args.host))
         return
     
     # Command line mode
+    # 分析进度通过 logging 输出, 命令行模式下只把 analyzer 的日志打印到 stdout
+    analyzer_logger.setLevel(logging.INFO)
+    analyzer_logger.addHandler(logging.StreamHandler(sys.stdout))
     print(f"Analyzing database: {args.db}")
     print("-" * 80)
     
-    results = analyze_mispredictions(args.db, args.top, tick_range, args.min_branches)
+    results = analyze_mispredictions(args.db, args.top, tick_range, args.min_branches,
+                                     build_index=args.build_index)
     
     if not results:
         print("\nNo data found with current filters.")
@@ -117,6 +128,8 @@ Note: PC addresses are displayed as full addresses (original PC << 1)
     
     # Generate static plots
     if args.plot:
+        # 导入 visualizer.py 中的函数
+        from visualizer import create_static_chart
         print(f"\nGenerating chart: {args.output}")
         create_static_chart(results, args.output)
     
@@ -138,8 +151,8 @@ Note: PC addresses are displayed as full addresses (original PC << 1)
         print(f"Total mispredictions: {sum(mispred_counts):,}")
         if sum(total_branches) > 0:
             print(f"Overall misprediction rate: {sum(mispred_counts)/sum(total_branches)*100:.2f}%")
-        print(f"Average misprediction rate: {np.mean(mispred_rates):.2f}%")
-        print(f"Median misprediction rate: {np.median(mispred_rates):.2f}%")
+        print(f"Average misprediction rate: {mean(mispred_rates):.2f}%")
+        print(f"Median misprediction rate: {median(mispred_rates):.2f}%")
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -12,6 +12,10 @@ setup(
         "matplotlib>=3.5.0",
         "numpy>=1.21.0",
     ],
+    extras_require={
+        "server": ["gunicorn>=20.0.0", "gevent>=21.0.0"],
+        "fast": ["orjson>=3.6.0", "flask-compress>=1.10"],
+    },
     entry_points={
         "console_scripts": [
             "mispred-analyzer=mispred_analyzer.main:main",
@@ -1,17 +1,98 @@
 # visualizer.py
 import io
 import base64
+import threading
 import numpy as np
+import matplotlib
+matplotlib.use('Agg')  # Charts are only rendered to files/buffers
 import matplotlib.pyplot as plt
+from matplotlib.cm import ScalarMappable
+from matplotlib.figure import Figure
 from typing import List, Tuple
 
+plt.style.use('default')
+
+# Figures are created once per layout and reused across calls
+_FIG_CACHE = {}
+_FIG_LOCK = threading.Lock()
+
+_DATA_URL_PREFIX = "data:image/png;base64,"
+
+def _get_figure(figsize: Tuple[int, int], with_colorbar: bool = False):
+    """
+    Return a cached 2x2 figure for the given size with all axes cleared
+    
+    Returns:
+        (fig, axes, cax) where cax is the colorbar axes or None
+    """
+    key = (figsize, with_colorbar)
+    if key not in _FIG_CACHE:
+        fig = Figure(figsize=figsize)
+        axes = fig.subplots(2, 2)
+        cax = None
+        if with_colorbar:
+            # Carve the colorbar slot out of the scatter axes only once,
+            # otherwise the scatter plot would shrink on every reuse
+            cax = fig.colorbar(ScalarMappable(cmap='RdYlGn_r'), ax=axes[1, 1]).ax
+        _FIG_CACHE[key] = (fig, axes, cax)
+    
+    fig, axes, cax = _FIG_CACHE[key]
+    for ax in axes.flat:
+        ax.clear()
+    if cax is not None:
+        cax.clear()
+    return fig, axes, cax
+
+def _columns(results: List[Tuple[int, int, int, int, float]]):
+    """
+    Split result tuples into chart columns with a single transpose
+    
+    Returns:
+        (pcs, totals, mispreds, rates) with pcs as hex full addresses
+        and rates in percent
+    """
+    _, starts, totals, mispreds, rates, *hexes = zip(*results)
+    # Rows from analyze_mispredictions carry the hex addresses already
+    pcs = list(hexes[1]) if hexes else [hex(pc) for pc in starts]
+    return pcs, totals, mispreds, np.multiply(rates, 100)
+
+def _display_labels(pcs: List[str]) -> List[str]:
+    """Truncate long PC addresses when there are too many bars to fit"""
+    if len(pcs) <= 15:
+        return pcs
+    return [f"{pc[:8]}..." if len(pc) > 10 else pc for pc in pcs]
+
+def _bar(ax, indices, values, color: str, title: str, xticklabels: List[str],
+         ylabel: str = None, value_labels: List[str] = None, alpha: float = None,
+         grid: bool = False):
+    """
+    Draw one per-PC bar chart
+    
+    Args:
+        ylabel: Y axis label, omitted if None
+        value_labels: Preformatted labels shown on top of the bars, omitted if None
+    """
+    bars = ax.bar(indices, values, color=color, alpha=alpha)
+    ax.set_xlabel('PC Address (Full)')
+    if ylabel:
+        ax.set_ylabel(ylabel)
+    ax.set_title(title)
+    ax.set_xticks(indices)
+    ax.set_xticklabels(xticklabels, rotation=45, ha='right', fontsize=8)
+    if grid:
+        ax.grid(True, alpha=0.3)
+    if value_labels is not None:
+        # Add values on top of bars
+        ax.bar_label(bars, labels=value_labels, padding=2, fontsize=7)
+
 def create_static_chart(results: List[Tuple[int, int, int, int, float]], 
                        output_file: str = None) -> str:
     """
     Create a static chart and return base64 encoded image or save to file
     
     Args:
-        results: List of (orig_pc, full_pc, total, mispred, rate)
+        results: List of (orig_pc, full_pc, total, mispred, rate), optionally
+                 followed by (pc_hex, full_pc_hex)
         output_file: If provided, save chart to file. Otherwise return base64 string.
     
     Returns:
@@ -20,69 +101,64 @@ def create_static_chart(results: List[Tuple[int, int, int, int, float]],
     if not results:
         return None
     
-    plt.style.use('default')
+    with _FIG_LOCK:
+        fig = _draw_static_chart(results)
+        
+        if output_file:
+            # Save to file
+            fig.savefig(output_file, dpi=100, bbox_inches='tight')
+            print(f"Chart saved to: {output_file}")
+            return output_file
+        else:
+            # Convert to base64
+            buf = io.BytesIO()
+            fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+            # getbuffer() encodes the PNG in place instead of copying it out
+            return _DATA_URL_PREFIX + base64.b64encode(buf.getbuffer()).decode('ascii')
+
+def create_static_chart_png(results: List[Tuple[int, int, int, int, float]]) -> bytes:
+    """
+    Create the static chart as raw PNG bytes
+    
+    Args:
+        results: List of (orig_pc, full_pc, total, mispred, rate), optionally
+                 followed by (pc_hex, full_pc_hex)
+    
+    Returns:
+        PNG image bytes, or None if there are no results
+    """
+    if not results:
+        return None
     
+    with _FIG_LOCK:
+        fig = _draw_static_chart(results)
+        buf = io.BytesIO()
+        fig.savefig(buf, format='png', dpi=100, bbox_inches='tight')
+        return buf.getvalue()
+
+def _draw_static_chart(results: List[Tuple[int, int, int, int, float]]) -> Figure:
+    """Draw the static chart into its cached figure; caller holds _FIG_LOCK"""
     # Create a simpler single chart
-    fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(16, 12))
+    fig, ((ax1, ax2), (ax3, ax4)), cax = _get_figure((16, 12), with_colorbar=True)
     
     # Extract data - use full_pc for display
-    pcs = [hex(r[1]) for r in results]  # r[1] is full_pc
-    totals = [r[2] for r in results]    # r[2] is total count
-    mispreds = [r[3] for r in results]  # r[3] is mispred count
-    rates = [r[4] * 100 for r in results]  # r[4] is mispred_rate
+    pcs, totals, mispreds, rates = _columns(results)
     
     indices = np.arange(len(pcs))
+    display_pcs = _display_labels(pcs)
     
-    # Chart 1: Misprediction Count
-    bars1 = ax1.bar(indices, mispreds, color='#ef4444', alpha=0.8)
-    ax1.set_xlabel('PC Address (Full)')
-    ax1.set_ylabel('Misprediction Count')
-    ax1.set_title('Top PCs by Misprediction Count')
-    ax1.set_xticks(indices)
-    
-    # Truncate PC display if too long
-    if len(pcs) > 15:
-        display_pcs = []
-        for pc in pcs:
-            if len(pc) > 10:
-                display_pcs.append(f"{pc[:8]}...")
-            else:
-                display_pcs.append(pc)
-    else:
-        display_pcs = pcs
-        
-    ax1.set_xticklabels(display_pcs, rotation=45, ha='right', fontsize=8)
-    ax1.grid(True, alpha=0.3)
-    
-    # Add values on top of bars
-    for i, v in enumerate(mispreds):
-        ax1.text(i, v + max(mispreds)*0.01, f'{v:,}', ha='center', va='bottom', fontsize=7)
-    
-    # Chart 2: Misprediction Rate
-    bars2 = ax2.bar(indices, rates, color='#f59e0b', alpha=0.8)
-    ax2.set_xlabel('PC Address (Full)')
-    ax2.set_ylabel('Misprediction Rate (%)')
-    ax2.set_title('Top PCs by Misprediction Rate')
-    ax2.set_xticks(indices)
-    ax2.set_xticklabels(display_pcs, rotation=45, ha='right', fontsize=8)
-    ax2.grid(True, alpha=0.3)
-    
-    # Add values on top of bars
-    for i, v in enumerate(rates):
-        ax2.text(i, v + max(rates)*0.01, f'{v:.1f}%', ha='center', va='bottom', fontsize=7)
-    
-    # Chart 3: Total Branches
-    bars3 = ax3.bar(indices, totals, color='#3b82f6', alpha=0.8)
-    ax3.set_xlabel('PC Address (Full)')
-    ax3.set_ylabel('Total Branch Count')
-    ax3.set_title('Top PCs by Total Branches')
-    ax3.set_xticks(indices)
-    ax3.set_xticklabels(display_pcs, rotation=45, ha='right', fontsize=8)
-    ax3.grid(True, alpha=0.3)
-    
-    # Add values on top of bars
-    for i, v in enumerate(totals):
-        ax3.text(i, v + max(totals)*0.01, f'{v:,}', ha='center', va='bottom', fontsize=7)
+    # Format every value label once up front
+    mispred_labels = [f'{v:,}' for v in mispreds]
+    rate_labels = [f'{v:.1f}%' for v in rates]
+    total_labels = [f'{v:,}' for v in totals]
+    
+    # Charts 1-3: Misprediction Count, Misprediction Rate, Total Branches
+    _bar(ax1, indices, mispreds, '#ef4444', 'Top PCs by Misprediction Count', display_pcs,
+         ylabel='Misprediction Count', value_labels=mispred_labels, alpha=0.8, grid=True)
+    _bar(ax2, indices, rates, '#f59e0b', 'Top PCs by Misprediction Rate', display_pcs,
+         ylabel='Misprediction Rate (%)', value_labels=rate_labels, alpha=0.8, grid=True)
+    _bar(ax3, indices, totals, '#3b82f6', 'Top PCs by Total Branches', display_pcs,
+         ylabel='Total Branch Count', value_labels=total_labels, alpha=0.8, grid=True)
     
     # Chart 4: Scatter plot
     scatter = ax4.scatter(totals, mispreds, c=rates, s=50, cmap='RdYlGn_r', alpha=0.8)
@@ -92,37 +168,24 @@ def create_static_chart(results: List[Tuple[int, int, int, int, float]],
     ax4.grid(True, alpha=0.3)
     
     # Add colorbar
-    plt.colorbar(scatter, ax=ax4).set_label('Misprediction Rate (%)')
+    fig.colorbar(scatter, cax=cax).set_label('Misprediction Rate (%)')
     
     # Add labels to some points
-    for i, (pc, x, y) in enumerate(zip(display_pcs[:5], totals[:5], mispreds[:5])):
+    for pc, x, y in zip(display_pcs[:5], totals[:5], mispreds[:5]):
         ax4.annotate(pc, (x, y), xytext=(5, 5), textcoords='offset points', fontsize=7)
     
-    plt.suptitle('PC Misprediction Analysis (PCs shown as full addresses)', 
-                fontsize=14, fontweight='bold')
-    plt.tight_layout()
-    
-    if output_file:
-        # Save to file
-        plt.savefig(output_file, dpi=100, bbox_inches='tight')
-        plt.close(fig)
-        print(f"Chart saved to: {output_file}")
-        return output_file
-    else:
-        # Convert to base64
-        buf = io.BytesIO()
-        plt.savefig(buf, format='png', dpi=100, bbox_inches='tight')
-        plt.close(fig)
-        buf.seek(0)
-        img_str = base64.b64encode(buf.read()).decode('utf-8')
-        return f"data:image/png;base64,{img_str}"
+    fig.suptitle('PC Misprediction Analysis (PCs shown as full addresses)', 
+                 fontsize=14, fontweight='bold')
+    fig.tight_layout()
+    return fig
 
 def create_export_chart(results: List[Tuple[int, int, int, int, float]]) -> io.BytesIO:
     """
     Create a chart specifically for export (returns BytesIO object)
     
     Args:
-        results: List of (orig_pc, full_pc, total, mispred, rate)
+        results: List of (orig_pc, full_pc, total, mispred, rate), optionally
+                 followed by (pc_hex, full_pc_hex)
     
     Returns:
         BytesIO object containing chart image
@@ -130,61 +193,36 @@ def create_export_chart(results: List[Tuple[int, int, int, int, float]]) -> io.B
     if not results:
         return None
     
-    plt.style.use('default')
-    fig, axes = plt.subplots(2, 2, figsize=(14, 10))
+    with _FIG_LOCK:
+        return _render_export_chart(results)
+
+def _render_export_chart(results: List[Tuple[int, int, int, int, float]]) -> io.BytesIO:
+    """Render create_export_chart output; caller holds _FIG_LOCK"""
+    fig, axes, _ = _get_figure((14, 10))
     
     # Extract data
-    pcs = [hex(r[1]) for r in results]  # r[1] is full_pc
-    totals = [r[2] for r in results]    # r[2] is total count
-    mispreds = [r[3] for r in results]  # r[3] is mispred count
-    rates = [r[4] * 100 for r in results]  # r[4] is mispred_rate
+    pcs, totals, mispreds, rates = _columns(results)
     
     indices = np.arange(len(pcs))
+    display_pcs = _display_labels(pcs)
     
     # Create charts
-    axes[0, 0].bar(indices, mispreds, color='#ef4444')
-    axes[0, 0].set_title('Misprediction Count')
-    axes[0, 0].set_xlabel('PC Address (Full)')
-    axes[0, 0].set_xticks(indices)
-    
-    # Truncate long PC addresses for display
-    if len(pcs) > 15:
-        display_pcs = []
-        for pc in pcs:
-            if len(pc) > 10:
-                display_pcs.append(f"{pc[:8]}...")
-            else:
-                display_pcs.append(pc)
-    else:
-        display_pcs = pcs
-        
-    axes[0, 0].set_xticklabels(display_pcs, rotation=45, ha='right', fontsize=8)
-    
-    axes[0, 1].bar(indices, rates, color='#f59e0b')
-    axes[0, 1].set_title('Misprediction Rate (%)')
-    axes[0, 1].set_xlabel('PC Address (Full)')
-    axes[0, 1].set_xticks(indices)
-    axes[0, 1].set_xticklabels(display_pcs, rotation=45, ha='right', fontsize=8)
-    
-    axes[1, 0].bar(indices, totals, color='#3b82f6')
-    axes[1, 0].set_title('Total Branches')
-    axes[1, 0].set_xlabel('PC Address (Full)')
-    axes[1, 0].set_xticks(indices)
-    axes[1, 0].set_xticklabels(display_pcs, rotation=45, ha='right', fontsize=8)
+    _bar(axes[0, 0], indices, mispreds, '#ef4444', 'Misprediction Count', display_pcs)
+    _bar(axes[0, 1], indices, rates, '#f59e0b', 'Misprediction Rate (%)', display_pcs)
+    _bar(axes[1, 0], indices, totals, '#3b82f6', 'Total Branches', display_pcs)
     
     axes[1, 1].scatter(totals, mispreds, c=rates, cmap='RdYlGn_r')
     axes[1, 1].set_title('Mispredictions vs Total Branches')
     axes[1, 1].set_xlabel('Total Branches')
     axes[1, 1].set_ylabel('Misprediction Count')
     
-    plt.suptitle('PC Misprediction Analysis (PCs shown as full addresses)', 
-                fontsize=12, fontweight='bold')
-    plt.tight_layout()
+    fig.suptitle('PC Misprediction Analysis (PCs shown as full addresses)', 
+                 fontsize=12, fontweight='bold')
+    fig.tight_layout()
     
     # Save to buffer
     buf = io.BytesIO()
-    plt.savefig(buf, format='png', dpi=150, bbox_inches='tight')
-    plt.close(fig)
+    fig.savefig(buf, format='png', dpi=150, bbox_inches='tight')
     buf.seek(0)
     
     return buf
\ No newline at end of file
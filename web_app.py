@@ -1,50 +1,77 @@
 # web_app.py
-from flask import Flask, request, jsonify, Response, send_file
+from flask import Flask, request, jsonify, Response, send_file, stream_with_context, url_for
+import atexit
+import hashlib
 import io
+import logging
+import logging.handlers
+import os
+import queue
+import sys
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
 from typing import Optional, Tuple
 import analyzer
 import visualizer
 
-class MispredictionWebApp:
-    def __init__(self, db_path: str):
-        self.db_path = db_path
-        self.app = Flask(__name__)
-        self.current_results = []
-        self.current_stats = {}
-        self.setup_routes()
+try:
+    import orjson  # Optional: faster JSON encoding for /analyze
+except ImportError:
+    orjson = None
+
+try:
+    from flask_compress import Compress  # Optional: gzip text responses
+except ImportError:
+    Compress = None
+
+logger = logging.getLogger(__name__)
+_log_listener = None
+
+def setup_logging(level=None):
+    """
+    Write this module's and the analyzer's log records to stdout from a background thread
     
-    def setup_routes(self):
-        """Setup all Flask routes"""
-        @self.app.route('/')
-        def index():
-            return self.get_index_html()
-        
-        @self.app.route('/analyze', methods=['POST'])
-        def analyze():
-            return self.handle_analysis()
-        
-        @self.app.route('/export/csv')
-        def export_csv():
-            return self.handle_export_csv()
-        
-        @self.app.route('/export/chart')
-        def export_chart():
-            return self.handle_export_chart()
-        
-        @self.app.route('/health')
-        def health():
-            return jsonify({'status': 'ok'})
+    Request handlers only enqueue records, the blocking stdout writes
+    happen in a QueueListener thread. The level defaults to the
+    TAGE_LOG_LEVEL environment variable (INFO if unset); WARNING skips
+    formatting of per-request messages entirely.
+    """
+    global _log_listener
+    loggers = (logger, analyzer.logger)
+    for log in loggers:
+        log.setLevel(level or os.environ.get('TAGE_LOG_LEVEL', 'INFO').upper())
+    if _log_listener is not None:
+        return
     
-    def get_index_html(self):
-        """Return the HTML interface"""
-        return '''
+    log_queue = queue.SimpleQueue()
+    for log in loggers:
+        log.addHandler(logging.handlers.QueueHandler(log_queue))
+        log.propagate = False
+    
+    _log_listener = logging.handlers.QueueListener(log_queue, logging.StreamHandler(sys.stdout))
+    _log_listener.start()
+    atexit.register(_log_listener.stop)
+
+@dataclass(frozen=True)
+class AnalysisParams:
+    """Analysis request parameters; hashable, so also the results cache key"""
+    top_n: int = 20
+    min_branches: int = 10
+    tick_range: Optional[Tuple[int, int]] = None
+
+# The interface is static, so it is encoded and hashed once at import
+_INDEX_HTML = '''
         <!DOCTYPE html>
         <html>
         <head>
             <title>PC Misprediction Analyzer</title>
             <meta charset="utf-8">
             <meta name="viewport" content="width=device-width, initial-scale=1">
-            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet">
+            <link rel="preconnect" href="https://cdn.jsdelivr.net" crossorigin>
+            <link href="https://cdn.jsdelivr.net/npm/bootstrap@5.1.3/dist/css/bootstrap.min.css" rel="stylesheet"
+                  integrity="sha384-1BmE4kWBq78iYhFldvKuhfTAU6auU8tT94WrHftjDbrCEXSU1oBoqyl2QvZ6jIW3" crossorigin="anonymous">
             <style>
                 body { padding: 20px; background-color: #f8f9fa; }
                 .container { max-width: 1600px; }
@@ -119,6 +146,12 @@ class MispredictionWebApp:
                                 <label for="tickEnd" class="form-label">Tick End (Optional)</label>
                                 <input type="number" class="form-control" id="tickEnd" placeholder="End tick">
                             </div>
+                            <div class="col-12">
+                                <div class="form-check">
+                                    <input class="form-check-input" type="checkbox" id="includeChart" checked>
+                                    <label class="form-check-label" for="includeChart">Include chart</label>
+                                </div>
+                            </div>
                             <div class="col-12">
                                 <button type="submit" class="btn btn-primary">Analyze</button>
                                 <button type="button" id="exportCsv" class="btn btn-success">Export CSV</button>
@@ -215,6 +248,9 @@ class MispredictionWebApp:
                     document.getElementById('loading').style.display = show ? 'block' : 'none';
                 }
                 
+                // Last successful analysis, reused when the server answers 304
+                let lastAnalysis = null;
+                
                 function analyze() {
                     showLoading(true);
                     
@@ -222,21 +258,36 @@ class MispredictionWebApp:
                         top_n: document.getElementById('topN').value,
                         min_branches: document.getElementById('minBranches').value,
                         tick_start: document.getElementById('tickStart').value || null,
-                        tick_end: document.getElementById('tickEnd').value || null
+                        tick_end: document.getElementById('tickEnd').value || null,
+                        include_chart: document.getElementById('includeChart').checked
                     };
                     
+                    const headers = {
+                        'Content-Type': 'application/json',
+                    };
+                    if (lastAnalysis) {
+                        headers['If-None-Match'] = lastAnalysis.etag;
+                    }
+                    
                     fetch('/analyze', {
                         method: 'POST',
-                        headers: {
-                            'Content-Type': 'application/json',
-                        },
+                        headers: headers,
                         body: JSON.stringify(formData)
                     })
                     .then(response => {
+                        if (response.status === 304) {
+                            return lastAnalysis.data;
+                        }
                         if (!response.ok) {
                             throw new Error('Network response was not ok');
                         }
-                        return response.json();
+                        const etag = response.headers.get('ETag');
+                        return response.json().then(data => {
+                            if (etag && !data.error) {
+                                lastAnalysis = { etag: etag, data: data };
+                            }
+                            return data;
+                        });
                     })
                     .then(data => {
                         showLoading(false);
@@ -254,9 +305,9 @@ class MispredictionWebApp:
                         document.getElementById('avgRate').textContent = data.stats.avg_rate.toFixed(2) + '%';
                         
                         // Show chart
-                        document.getElementById('chartContainer').style.display = 'block';
-                        if (data.chart_image) {
-                            document.getElementById('chartImage').src = data.chart_image;
+                        document.getElementById('chartContainer').style.display = data.chart_url ? 'block' : 'none';
+                        if (data.chart_url) {
+                            document.getElementById('chartImage').src = data.chart_url;
                             document.getElementById('chartImage').style.display = 'block';
                         } else {
                             document.getElementById('chartImage').style.display = 'none';
@@ -267,15 +318,16 @@ class MispredictionWebApp:
                         const tbody = document.getElementById('resultsBody');
                         tbody.innerHTML = '';
                         
-                        data.results.forEach((item, index) => {
+                        // Rows follow data.columns: rank, pc, startPc, total, mispred, rate
+                        data.rows.forEach(([rank, pc, startPc, total, mispred, rate]) => {
                             const row = document.createElement('tr');
                             row.innerHTML = `
-                                <td>${index + 1}</td>
-                                <td><code class="pc">${item.pc}</code></td>
-                                <td><code class="startPc">${item.startPc}</code></td>
-                                <td>${item.total.toLocaleString()}</td>
-                                <td>${item.mispred.toLocaleString()}</td>
-                                <td>${item.rate.toFixed(2)}%</td>
+                                <td>${rank}</td>
+                                <td><code class="pc">${pc}</code></td>
+                                <td><code class="startPc">${startPc}</code></td>
+                                <td>${total.toLocaleString()}</td>
+                                <td>${mispred.toLocaleString()}</td>
+                                <td>${rate.toFixed(2)}%</td>
                             `;
                             tbody.appendChild(row);
                         });
@@ -305,48 +357,224 @@ class MispredictionWebApp:
                     });
                 }
                 
-                // Perform initial analysis on page load
-                window.addEventListener('DOMContentLoaded', function() {
-                    analyze();
-                });
+                // Perform initial analysis right away; the form above is already parsed
+                analyze();
             </script>
         </body>
         </html>
-        '''
+        '''.encode('utf-8')
+_INDEX_ETAG = hashlib.md5(_INDEX_HTML).hexdigest()
+
+class MispredictionWebApp:
+    def __init__(self, db_path: str, build_index: bool = False):
+        setup_logging()
+        self.db_path = db_path
+        # Opt-in: tick range analyses may add STAMP indexes to the database
+        self.build_index = build_index
+        self.app = Flask(__name__)
+        if Compress is not None:
+            # PNG charts are already compressed and stay excluded
+            self.app.config['COMPRESS_MIMETYPES'] = [
+                'application/json', 'text/html', 'text/css', 'text/csv'
+            ]
+            self.app.config['COMPRESS_MIN_SIZE'] = 512
+            Compress(self.app)
+        self.current_results = []
+        self.current_stats = {}
+        # Analysis results and charts keyed by (AnalysisParams, database mtime)
+        self._results_cache = OrderedDict()
+        self._results_cache_size = 16
+        # Chart ids handed to the browser -> results cache key
+        self._chart_keys = {}
+        self._cache_lock = threading.Lock()
+        # (checked_at, mtime) of the database file, see _db_mtime
+        self._mtime_cache = (float('-inf'), 0.0)
+        self._mtime_ttl = 5.0
+        self.setup_routes()
+    
+    def setup_routes(self):
+        """Setup all Flask routes"""
+        @self.app.route('/')
+        def index():
+            return self.handle_index()
+        
+        @self.app.route('/analyze', methods=['POST'])
+        def analyze():
+            return self.handle_analysis()
+        
+        @self.app.route('/export/csv')
+        def export_csv():
+            return self.handle_export_csv()
+        
+        @self.app.route('/export/chart')
+        def export_chart():
+            return self.handle_export_chart()
+        
+        @self.app.route('/chart/<cid>')
+        def chart(cid):
+            return self.handle_chart(cid)
+        
+        @self.app.route('/health')
+        def health():
+            return jsonify({'status': 'ok'})
+    
+    @staticmethod
+    def _parse_params(source) -> AnalysisParams:
+        """
+        Parse analysis parameters from a JSON body or query string
+        
+        An incomplete or invalid tick range is ignored.
+        """
+        tick_range = None
+        tick_start = source.get('tick_start')
+        tick_end = source.get('tick_end')
+        
+        if tick_start and tick_end:
+            try:
+                tick_range = (int(tick_start), int(tick_end))
+            except ValueError:
+                logger.warning("Invalid tick range values")
+        
+        return AnalysisParams(
+            top_n=int(source.get('top_n', 20)),
+            min_branches=int(source.get('min_branches', 10)),
+            tick_range=tick_range
+        )
+    
+    def _get_entry(self, params: AnalysisParams) -> dict:
+        """
+        Return the cache entry for these parameters, running the analysis on a miss
+        
+        Entries hold the results plus the charts rendered from them, which
+        are filled in lazily by _get_static_chart and _get_export_chart.
+        """
+        key = (params, self._db_mtime())
+        with self._cache_lock:
+            entry = self._results_cache.get(key)
+            if entry is not None:
+                self._results_cache.move_to_end(key)
+                return entry
+        
+        results = analyzer.analyze_mispredictions(
+            self.db_path, params.top_n, params.tick_range, params.min_branches,
+            build_index=self.build_index
+        )
+        # Creating the STAMP indexes touches the file, so key the entry on
+        # the mtime after the query to let the next request hit
+        key = (params, self._db_mtime(refresh=True))
+        # Derived from the parameters and mtime so a chart URL stays the same
+        # across sessions but changes with the data it shows
+        chart_id = hashlib.md5(repr(key).encode('utf-8')).hexdigest()[:16]
+        entry = {'results': results, 'mtime': key[1], 'chart_id': chart_id,
+                 'chart_static': None, 'chart_export': None}
+        with self._cache_lock:
+            self._results_cache[key] = entry
+            self._chart_keys[chart_id] = key
+            if len(self._results_cache) > self._results_cache_size:
+                _, evicted = self._results_cache.popitem(last=False)
+                self._chart_keys.pop(evicted['chart_id'], None)
+        return entry
+    
+    @staticmethod
+    def _get_static_chart(entry: dict) -> Optional[bytes]:
+        """Return the static chart PNG bytes for a cache entry, rendering it once"""
+        if entry['chart_static'] is None:
+            entry['chart_static'] = visualizer.create_static_chart_png(entry['results'])
+        return entry['chart_static']
+    
+    @staticmethod
+    def _get_export_chart(entry: dict) -> Optional[io.BytesIO]:
+        """Return the export chart PNG for a cache entry, rendering it once"""
+        if entry['chart_export'] is None:
+            buf = visualizer.create_export_chart(entry['results'])
+            if buf is None:
+                return None
+            entry['chart_export'] = buf.getvalue()
+        # A fresh buffer per response, send_file consumes and closes it
+        return io.BytesIO(entry['chart_export'])
+    
+    @staticmethod
+    def _json_response(payload: dict) -> Response:
+        """Encode a JSON response with orjson when installed, else jsonify"""
+        if orjson is None:
+            return jsonify(payload)
+        return Response(orjson.dumps(payload), mimetype='application/json')
+    
+    def _db_mtime(self, refresh: bool = False) -> float:
+        """Database mtime, re-read from disk at most every _mtime_ttl seconds"""
+        now = time.monotonic()
+        checked_at, mtime = self._mtime_cache
+        if not refresh and now - checked_at < self._mtime_ttl:
+            return mtime
+        mtime = os.path.getmtime(self.db_path)
+        self._mtime_cache = (now, mtime)
+        return mtime
+    
+    @staticmethod
+    def _etag(entry: dict, *params) -> str:
+        """ETag of a response built from entry, computed from the mtime the entry was built at"""
+        mtime = entry['mtime']
+        return hashlib.blake2b(f'{params}|{mtime}'.encode('utf-8'), digest_size=12).hexdigest()
+    
+    @staticmethod
+    def _not_modified(etag: str) -> Optional[Response]:
+        """Return an empty 304 response if the client already holds etag"""
+        # flask-compress tags compressed responses as "<etag>:<encoding>"
+        held = {tag.split(':', 1)[0] for tag in request.if_none_match.as_set(include_weak=True)}
+        if etag not in held:
+            return None
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    
+    @staticmethod
+    def _with_etag(response: Response, etag: str) -> Response:
+        """Tag a response so the client revalidates it with If-None-Match"""
+        response.set_etag(etag)
+        response.headers['Cache-Control'] = 'private, must-revalidate'
+        return response
+    
+    def handle_index(self):
+        """Serve the HTML interface, answering 304 if the browser copy is current"""
+        response = Response(
+            _INDEX_HTML,
+            mimetype='text/html',
+            headers={'Cache-Control': 'public, max-age=3600'}
+        )
+        response.set_etag(_INDEX_ETAG)
+        return response.make_conditional(request)
     
     def handle_analysis(self):
         """Handle analysis request from web interface"""
         try:
             data = request.json
-            print(f"Received analysis request: {data}")
-            
-            top_n = int(data.get('top_n', 20))
-            min_branches = int(data.get('min_branches', 10))
+            logger.debug("Received analysis request: %s", data)
             
-            tick_range = None
-            tick_start = data.get('tick_start')
-            tick_end = data.get('tick_end')
+            params = self._parse_params(data)
+            if params.tick_range:
+                logger.debug("Using tick range: %s", params.tick_range)
             
-            if tick_start and tick_end:
-                try:
-                    tick_range = (int(tick_start), int(tick_end))
-                    print(f"Using tick range: {tick_range}")
-                except ValueError:
-                    print("Invalid tick range values")
+            # Table-only clients skip the chart, which is then never rendered
+            include_chart = bool(data.get('include_chart', True))
             
             # Perform analysis
-            print(f"Starting analysis with top_n={top_n}, min_branches={min_branches}")
-            results = analyzer.analyze_mispredictions(
-                self.db_path, top_n * 3, tick_range, min_branches
-            )
-            results = results[:top_n]  # Final limit
+            logger.info("Starting analysis with top_n=%d, min_branches=%d",
+                        params.top_n, params.min_branches)
+            entry = self._get_entry(params)
+            
+            etag = self._etag(entry, params, include_chart)
+            not_modified = self._not_modified(etag)
+            if not_modified:
+                return not_modified
+            
+            results = entry['results']
             
             if not results:
                 return jsonify({
                     'error': 'No data found with current filters. Try reducing Minimum Branches.'
                 })
             
-            print(f"Analysis completed: found {len(results)} PCs")
+            logger.info("Analysis completed: found %d PCs", len(results))
             
             # Calculate statistics
             total_count = sum(r[2] for r in results)  # r[2] is total count
@@ -362,130 +590,146 @@ class MispredictionWebApp:
                 'avg_rate': round(avg_rate, 2)
             }
             
-            # Format results for JSON
-            formatted_results = []
-            for i, (pc, startPc, total, mispred, rate) in enumerate(results):
-                formatted_results.append({
-                    'rank': i + 1,
-                    'pc': hex(pc),
-                    'startPc': hex(startPc),
-                    'total': total,
-                    'mispred': mispred,
-                    'rate': round(rate * 100, 2)
-                })
+            # Format results for JSON as rows under a single column list
+            rows = [
+                [i, pc_hex, sp_hex, total, mispred, round(rate * 100, 2)]
+                for i, (_, _, total, mispred, rate, pc_hex, sp_hex) in enumerate(results, 1)
+            ]
             
-            # Create chart
-            print("Generating chart...")
-            chart_image = visualizer.create_static_chart(results)
-            print("Chart generated successfully")
+            # The browser fetches the chart PNG separately, rendered on first request
+            chart_url = url_for('chart', cid=entry['chart_id']) if include_chart else None
             
-            return jsonify({
-                'results': formatted_results,
+            return self._with_etag(self._json_response({
+                'columns': ['rank', 'pc', 'startPc', 'total', 'mispred', 'rate'],
+                'rows': rows,
                 'stats': self.current_stats,
-                'chart_image': chart_image
-            })
+                'chart_url': chart_url
+            }), etag)
             
         except Exception as e:
-            print(f"Error during analysis: {str(e)}")
-            import traceback
-            traceback.print_exc()
+            logger.exception("Error during analysis: %s", e)
             return jsonify({'error': str(e)})
     
+    def handle_chart(self, cid: str):
+        """Serve the static chart PNG of a cached analysis"""
+        with self._cache_lock:
+            key = self._chart_keys.get(cid)
+            entry = self._results_cache.get(key) if key is not None else None
+        if entry is None:
+            return jsonify({'error': 'Chart expired, please analyze again'}), 404
+        
+        png = self._get_static_chart(entry)
+        if png is None:
+            return jsonify({'error': 'Failed to create chart'}), 404
+        
+        return send_file(io.BytesIO(png), mimetype='image/png', max_age=3600)
+    
+    def _prepare_export(self, args) -> Tuple[Optional[Response], str, dict]:
+        """
+        Parse export parameters and look up their cache entry
+        
+        Returns:
+            (not_modified, etag, entry): not_modified is a 304 response when
+            the client already holds this export, else None
+        """
+        params = self._parse_params(args)
+        entry = self._get_entry(params)
+        etag = self._etag(entry, params)
+        return self._not_modified(etag), etag, entry
+    
     def handle_export_csv(self):
         """Handle CSV export request"""
         try:
-            # Get parameters from request
-            top_n = int(request.args.get('top_n', 20))
-            min_branches = int(request.args.get('min_branches', 10))
-            
-            tick_range = None
-            tick_start = request.args.get('tick_start')
-            tick_end = request.args.get('tick_end')
-            
-            if tick_start and tick_end:
-                try:
-                    tick_range = (int(tick_start), int(tick_end))
-                except ValueError:
-                    pass
-            
-            # Perform fresh analysis
-            results = analyzer.analyze_mispredictions(
-                self.db_path, top_n, tick_range, min_branches
-            )
+            not_modified, etag, entry = self._prepare_export(request.args)
+            if not_modified:
+                return not_modified
             
-            # Create CSV
-            output = io.StringIO()
-            output.write('Rank,PC,Start PC,Count,Mispred Count,Mispred Rate (%)\n')
-            
-            for i, (pc, startPc, total, mispred, rate) in enumerate(results, 1):
-                output.write(f'{i},{hex(pc)},{hex(startPc)},{total},{mispred},{rate*100:.2f}\n')
-            
-            output.seek(0)
-            
-            return Response(
-                output.getvalue(),
+            # Stream CSV lines as they are formatted
+            return self._with_etag(Response(
+                stream_with_context(self._csv_lines(entry['results'])),
                 mimetype='text/csv',
                 headers={'Content-Disposition': 'attachment;filename=misprediction_analysis.csv'}
-            )
+            ), etag)
         except Exception as e:
             return jsonify({'error': str(e)})
     
+    @staticmethod
+    def _csv_lines(results):
+        """Yield the CSV export header, then one line per result"""
+        yield 'Rank,PC,Start PC,Count,Mispred Count,Mispred Rate (%)\n'
+        for i, (_, _, total, mispred, rate, pc_hex, sp_hex) in enumerate(results, 1):
+            yield f'{i},{pc_hex},{sp_hex},{total},{mispred},{rate*100:.2f}\n'
+    
     def handle_export_chart(self):
         """Handle chart export request"""
         try:
-            # Get parameters from request
-            top_n = int(request.args.get('top_n', 20))
-            min_branches = int(request.args.get('min_branches', 10))
-            
-            tick_range = None
-            tick_start = request.args.get('tick_start')
-            tick_end = request.args.get('tick_end')
-            
-            if tick_start and tick_end:
-                try:
-                    tick_range = (int(tick_start), int(tick_end))
-                except ValueError:
-                    pass
-            
-            # Perform fresh analysis
-            results = analyzer.analyze_mispredictions(
-                self.db_path, top_n, tick_range, min_branches
-            )
+            not_modified, etag, entry = self._prepare_export(request.args)
+            if not_modified:
+                return not_modified
             
             # Create chart
-            chart_buf = visualizer.create_export_chart(results)
+            chart_buf = self._get_export_chart(entry)
             
             if chart_buf:
-                return send_file(
+                return self._with_etag(send_file(
                     chart_buf,
                     mimetype='image/png',
                     as_attachment=True,
                     download_name='misprediction_chart.png'
-                )
+                ), etag)
             else:
                 return jsonify({'error': 'Failed to create chart'})
         except Exception as e:
             return jsonify({'error': str(e)})
 
+    def _warm_cache(self):
+        """Precompute the analysis the page requests on load (form defaults)"""
+        try:
+            self._get_static_chart(self._get_entry(AnalysisParams()))
+        except Exception as e:
+            logger.warning("Cache warm-up failed: %s", e)
+    
     def run(self, host: str = '127.0.0.1', port: int = 5000):
         """Run the Flask web application"""
-        print(f"\n{'='*60}")
-        print("TAGE Trace Analyzer - Web Interface")
-        print(f"{'='*60}")
-        print(f"Server starting at: http://{host}:{port}")
-        print(f"Database: {self.db_path}")
-        print(f"\nInstructions:")
-        print("1. Open your web browser and go to the URL above")
-        print("2. Adjust parameters as needed")
-        print("3. Click 'Analyze' to see results")
-        print("4. Use 'Export CSV' or 'Export PNG' to save results")
-        print(f"{'='*60}")
+        logger.info("\n%s", '=' * 60)
+        logger.info("TAGE Trace Analyzer - Web Interface")
+        logger.info("%s", '=' * 60)
+        logger.info("Server starting at: http://%s:%d", host, port)
+        logger.info("Database: %s", self.db_path)
+        logger.info("\nInstructions:")
+        logger.info("1. Open your web browser and go to the URL above")
+        logger.info("2. Adjust parameters as needed")
+        logger.info("3. Click 'Analyze' to see results")
+        logger.info("4. Use 'Export CSV' or 'Export PNG' to save results")
+        logger.info("\nThis is the single-process Flask server. For concurrent users run:")
+        logger.info("  TAGE_DB_PATH=%s gunicorn web_app:app -k gevent -w 4", self.db_path)
+        logger.info("%s", '=' * 60)
+        
+        # Compute the page-load analysis while the server starts up
+        threading.Thread(target=self._warm_cache, daemon=True).start()
         
         try:
             self.app.run(host=host, port=port, debug=False)
         except Exception as e:
-            print(f"Failed to start server: {e}")
-            print(f"\nPossible issues:")
-            print(f"1. Port {port} might be in use. Try a different port")
-            print("2. Check if database file exists and is accessible")
-            print("3. Make sure Flask is installed: pip install flask")
\ No newline at end of file
+            logger.error("Failed to start server: %s", e)
+            logger.error("\nPossible issues:")
+            logger.error("1. Port %d might be in use. Try a different port", port)
+            logger.error("2. Check if database file exists and is accessible")
+            logger.error("3. Make sure Flask is installed: pip install flask")
+
+def __getattr__(name):
+    """
+    WSGI entry point for production servers, e.g.
+        TAGE_DB_PATH=trace.db gunicorn web_app:app -k gevent -w 4 --worker-connections 100
+    
+    Set TAGE_BUILD_INDEX=1 to let tick range analyses index the database.
+    
+    The app is only built when the server looks up web_app.app, so importing
+    this module (as main.py --web does) never creates a second instance.
+    """
+    if name == 'app' and 'TAGE_DB_PATH' in os.environ:
+        app = MispredictionWebApp(os.environ['TAGE_DB_PATH'],
+                                  build_index=os.environ.get('TAGE_BUILD_INDEX') == '1').app
+        globals()['app'] = app
+        return app
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")